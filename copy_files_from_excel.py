@@ -1,48 +1,71 @@
 import os
 import shutil
-import pandas as pd
+from openpyxl import load_workbook
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 def setup_parser():
     """Set up command-line arguments."""
     parser = argparse.ArgumentParser(description="Copy files based on an Excel file with source and destination columns.")
     parser.add_argument('--excel', type=str, required=True, help="Path to the Excel file (e.g., planned_moves.xlsx).")
     parser.add_argument('--prod', action='store_true', help="Execute the actual file copy. Without this, only simulates the process.")
+    parser.add_argument('--workers', type=int, default=8, help="Number of files copied concurrently (default: 8).")
     return parser
 
-def copy_files_from_excel(excel_path, prod=False):
+def copy_files_from_excel(excel_path, prod=False, max_workers=8):
     """Copy files based on the Excel file."""
     try:
-        # Load the Excel file
-        df = pd.read_excel(excel_path)
-        
-        # Ensure required columns exist
-        if 'Source' not in df.columns or 'Destination' not in df.columns:
-            print("Error: The Excel file must contain 'Source' and 'Destination' columns.")
-            return
+        # Stream the sheet rows, no need to build a DataFrame for two columns
+        wb = load_workbook(excel_path, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows, ())
+            
+            # Ensure required columns exist
+            if 'Source' not in header or 'Destination' not in header:
+                print("Error: The Excel file must contain 'Source' and 'Destination' columns.")
+                return
+            source_idx = header.index('Source')
+            destination_idx = header.index('Destination')
+            
+            pairs = [(row[source_idx], row[destination_idx]) for row in rows
+                     if row[source_idx] and row[destination_idx]]
+        finally:
+            wb.close()
         
-        total_files = len(df)
+        total_files = len(pairs)
         print(f"Found {total_files} file(s) to process.")
         
-        for idx, row in df.iterrows():
-            source = row['Source']
-            destination = row['Destination']
-            
+        to_copy = []
+        for source, destination in pairs:
             if not os.path.exists(source):
                 print(f"Warning: Source file does not exist: {source}")
                 continue
             
-            destination_dir = os.path.dirname(destination)
-            
             if not prod:
                 print(f"Would copy: {source} -> {destination}")
             else:
+                to_copy.append((source, destination))
+        
+        if to_copy:
+            # Create each destination directory once, before the workers start
+            for destination_dir in {os.path.dirname(destination) for _, destination in to_copy} - {''}:
                 try:
                     os.makedirs(destination_dir, exist_ok=True)
-                    shutil.copy2(source, destination)
-                    print(f"Copied: {source} -> {destination}")
-                except Exception as e:
-                    print(f"Error copying {source} to {destination}: {e}")
+                except OSError as e:
+                    print(f"Error creating directory {destination_dir}: {e}")
+            
+            # Copies are I/O bound, so threads overlap them well
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(shutil.copy2, source, destination): (source, destination)
+                           for source, destination in to_copy}
+                for future in as_completed(futures):
+                    source, destination = futures[future]
+                    try:
+                        future.result()
+                        print(f"Copied: {source} -> {destination}")
+                    except Exception as e:
+                        print(f"Error copying {source} to {destination}: {e}")
         
         print("\nProcess completed.")
         if not prod:
@@ -61,7 +84,7 @@ def main():
         return
     
     print(f"Processing Excel file: {excel_path}")
-    copy_files_from_excel(excel_path, prod=args.prod)
+    copy_files_from_excel(excel_path, prod=args.prod, max_workers=args.workers)
 
 if __name__ == "__main__":
     main()
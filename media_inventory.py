@@ -1,37 +1,69 @@
 import os
-import pandas as pd
-from pathlib import Path
-from PIL import Image
-from PIL.ExifTags import TAGS, GPSTAGS
-import magic
+# Heavy third-party modules (pandas, openpyxl, PIL, exifread, hachoir, geopy) are
+# imported where they are used: worker processes re-import this module on start
 import time
 import argparse
 import re
-from datetime import datetime
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
-from functools import lru_cache
+from datetime import datetime, date
 import math
 from time import sleep
 import concurrent.futures
-from hachoir.parser import createParser
-from hachoir.metadata import extractMetadata
+import functools
+import multiprocessing
+import threading
+import queue
 import warnings
-import exifread
 import configparser
+import csv
+import io
+import struct
+import shutil
+import subprocess
+import shelve
+import atexit
 from typing import List
 
 try:
-    from moviepy import VideoFileClip
-    MOVIEPY_AVAILABLE = True
+    import magic
+    MAGIC_AVAILABLE = True
 except ImportError:
-    MOVIEPY_AVAILABLE = False
-    print("Warning: moviepy not available. Video resolution information will be limited.")
+    MAGIC_AVAILABLE = False
+
+PHOTO_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp'})
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm'})
+MEDIA_EXTENSIONS = PHOTO_EXTENSIONS | VIDEO_EXTENSIONS
+# str.endswith takes a tuple and checks every suffix in C
+MEDIA_EXTENSIONS_TUPLE = tuple(sorted(MEDIA_EXTENSIONS))
+JPEG_EXTENSIONS = frozenset({'.jpg', '.jpeg'})
+HEADER_SIZE_EXTENSIONS = frozenset({'.png', '.gif', '.bmp'})
+TIFF_EXTENSIONS = frozenset({'.tiff'})
+
+# exifread stops walking an IFD at this tag; DateTimeDigitized and the rest of
+# the Exif IFD are only read when the original date is missing
+EXIF_STOP_TAG = 'DateTimeOriginal'
+
+# Column order of the inventory; checkpoint CSV appends need a fixed header
+INVENTORY_COLUMNS = [
+    'File Path', 'File Name', 'Directory', 'Type', 'Size (Bytes)', 'Size (MB)',
+    'Creation Date', 'Modified Date', 'Duplicate Status', 'Move Status',
+    'Resolution', 'GPS Coordinates', 'Photo Date', 'Country', 'City'
+]
+
+# Seconds between progress line refreshes
+PROGRESS_INTERVAL = 0.1
+
+CHECKPOINT_CSV = 'media_inventory_checkpoint.csv'
+
+# Files to ignore
+SYSTEM_FILES = frozenset({'desktop.ini', 'thumbs.db', '.ds_store'})
+
+# ffprobe only reads container headers, much cheaper than a full parse
+FFPROBE_PATH = shutil.which('ffprobe')
 
 def convert_to_degrees(value):
     """Helper function to convert GPS coordinates to degrees."""
     try:
-        if isinstance(value, tuple):
+        if isinstance(value, (tuple, list)):
             # If it's already a tuple of rationals
             d = float(value[0].numerator) / float(value[0].denominator) if value[0].denominator != 0 else 0
             m = float(value[1].numerator) / float(value[1].denominator) if value[1].denominator != 0 else 0
@@ -46,8 +78,149 @@ def convert_to_degrees(value):
         print(f"Warning: Error converting GPS value {value}: {str(e)}")
         return 0
 
+def parse_exif_date(date_str):
+    """Parse the date part of an EXIF 'YYYY:MM:DD HH:MM:SS' value, or return None."""
+    # Fixed-width field: slicing is much cheaper than strptime
+    try:
+        return date(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]))
+    except ValueError:
+        return None
+
+def _read_jpeg_headers(f):
+    """Walk JPEG markers up to the frame header, returning (exif_bytes, (width, height))."""
+    if f.read(2) != b'\xff\xd8':
+        return None, None
+    
+    exif_data = None
+    while True:
+        byte = f.read(1)
+        if byte != b'\xff':
+            return exif_data, None  # Truncated or not a marker
+        # Markers may be preceded by any number of 0xFF fill bytes
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return exif_data, None
+        code = byte[0]
+        if code in (0xD9, 0xDA):
+            # End of image or start of scan: no frame header found
+            return exif_data, None
+        if code == 0x01 or 0xD0 <= code <= 0xD7:
+            continue  # Standalone markers carry no length
+        
+        length = f.read(2)
+        if len(length) < 2 or struct.unpack('>H', length)[0] < 2:
+            return exif_data, None
+        segment_length = struct.unpack('>H', length)[0] - 2
+        
+        if code == 0xE1 and exif_data is None:
+            segment = f.read(segment_length)
+            if segment.startswith(b'Exif\x00\x00'):
+                # APP1 holds a TIFF structure with the EXIF tags
+                exif_data = segment[6:]
+        elif 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            # SOFn: precision (1 byte), height, width
+            height, width = struct.unpack('>HH', f.read(5)[1:5])
+            return exif_data, (width, height)
+        else:
+            # Skip ICC profiles, quantization tables, etc. without reading them
+            f.seek(segment_length, 1)
+
+def _read_header_dimensions(f):
+    """Get (width, height) of a PNG, GIF or BMP file from its first bytes."""
+    header = f.read(26)
+    if header.startswith(b'\x89PNG\r\n\x1a\n') and header[12:16] == b'IHDR':
+        return struct.unpack('>II', header[16:24])
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return struct.unpack('<HH', header[6:10])
+    if header.startswith(b'BM') and len(header) >= 26:
+        if struct.unpack('<I', header[14:18])[0] == 12:
+            # OS/2 BITMAPCOREHEADER uses 16-bit dimensions
+            return struct.unpack('<HH', header[18:22])
+        width, height = struct.unpack('<ii', header[18:26])
+        return width, abs(height)  # Negative height means a top-down bitmap
+    return None
+
+def _parse_exif_tags(tags):
+    """Get GPS coordinates and date taken from exifread tags."""
+    gps_coords = None
+    date_taken = None
+    
+    if all(k in tags for k in ['GPS GPSLatitude', 'GPS GPSLongitude', 'GPS GPSLatitudeRef', 'GPS GPSLongitudeRef']):
+        try:
+            lat = convert_to_degrees(tags['GPS GPSLatitude'].values)
+            lon = convert_to_degrees(tags['GPS GPSLongitude'].values)
+            lat_ref = tags['GPS GPSLatitudeRef'].printable
+            lon_ref = tags['GPS GPSLongitudeRef'].printable
+            
+            if lat_ref == 'S': lat = -lat
+            if lon_ref == 'W': lon = -lon
+            
+            gps_coords = f"{lat:.6f}, {lon:.6f}"
+        except Exception as e:
+            print(f"GPS extraction error: {str(e)}")
+    
+    for date_field in ['EXIF DateTimeOriginal', 'EXIF DateTimeDigitized', 'Image DateTime']:
+        if date_field in tags and tags[date_field].printable:
+            date_taken = parse_exif_date(str(tags[date_field].printable))
+            if date_taken:
+                break
+    
+    return gps_coords, date_taken
+
 def get_image_metadata(file_path):
     """Extract resolution, GPS coordinates, and date from image file."""
+    # Read only the headers where possible, PIL is kept for WebP and as fallback
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in JPEG_EXTENSIONS:
+        try:
+            with open(file_path, 'rb') as f:
+                exif_data, dimensions = _read_jpeg_headers(f)
+            if dimensions:
+                gps_coords = date_taken = None
+                if exif_data:
+                    try:
+                        import exifread
+                        tags = exifread.process_file(io.BytesIO(exif_data), stop_tag=EXIF_STOP_TAG,
+                                                     details=False)
+                        gps_coords, date_taken = _parse_exif_tags(tags)
+                    except Exception as e:
+                        print(f"EXIF extraction error for {file_path}: {str(e)}")
+                return f"{dimensions[0]}x{dimensions[1]}", gps_coords, date_taken
+        except (OSError, struct.error):
+            pass  # Let PIL report the problem
+    
+    # PNG/GIF/BMP practically never carry EXIF: the size is all we need
+    elif ext in HEADER_SIZE_EXTENSIONS:
+        try:
+            with open(file_path, 'rb') as f:
+                dimensions = _read_header_dimensions(f)
+            if dimensions:
+                return f"{dimensions[0]}x{dimensions[1]}", None, None
+        except (OSError, struct.error):
+            pass  # Let PIL report the problem
+    
+    # TIFF keeps its size in IFD0, which exifread reads anyway
+    elif ext in TIFF_EXTENSIONS:
+        try:
+            import exifread
+            with open(file_path, 'rb') as f:
+                tags = exifread.process_file(f, stop_tag=EXIF_STOP_TAG, details=False)
+            if 'Image ImageWidth' in tags and 'Image ImageLength' in tags:
+                width = tags['Image ImageWidth'].values[0]
+                height = tags['Image ImageLength'].values[0]
+                gps_coords, date_taken = _parse_exif_tags(tags)
+                return f"{width}x{height}", gps_coords, date_taken
+        except Exception:
+            pass  # Let PIL report the problem
+    
+    return _get_pil_image_metadata(file_path)
+
+def _get_pil_image_metadata(file_path):
+    """Extract resolution, GPS coordinates, and date from image file using PIL."""
+    from PIL import Image
+    from PIL.ExifTags import IFD, GPS, Base
+    
     try:
         with Image.open(file_path) as img:
             # Get resolution
@@ -59,18 +232,18 @@ def get_image_metadata(file_path):
             date_taken = None
             
             
-            if hasattr(img, '_getexif') and img._getexif() is not None:
-                exif = {TAGS.get(key, key): value for key, value in img._getexif().items()}
+            # getexif() reuses the EXIF block PIL already parsed on open
+            exif = img.getexif()
+            if exif:
                 # Get GPS coordinates
-                if 'GPSInfo' in exif:
+                gps_info = exif.get_ifd(IFD.GPS)
+                if gps_info:
                     try:
-                        gps_info = {GPSTAGS.get(key, key): value for key, value in exif['GPSInfo'].items()}
-                        
-                        if all(k in gps_info for k in ['GPSLatitude', 'GPSLongitude', 'GPSLatitudeRef', 'GPSLongitudeRef']):
-                            lat = convert_to_degrees(gps_info['GPSLatitude'])
-                            lon = convert_to_degrees(gps_info['GPSLongitude'])
-                            lat_ref = gps_info['GPSLatitudeRef']
-                            lon_ref = gps_info['GPSLongitudeRef']
+                        if all(k in gps_info for k in [GPS.GPSLatitude, GPS.GPSLongitude, GPS.GPSLatitudeRef, GPS.GPSLongitudeRef]):
+                            lat = convert_to_degrees(gps_info[GPS.GPSLatitude])
+                            lon = convert_to_degrees(gps_info[GPS.GPSLongitude])
+                            lat_ref = gps_info[GPS.GPSLatitudeRef]
+                            lon_ref = gps_info[GPS.GPSLongitudeRef]
                             
                             if lat_ref == 'S': lat = -lat
                             if lon_ref == 'W': lon = -lon
@@ -79,15 +252,15 @@ def get_image_metadata(file_path):
                     except Exception as e:
                         print(f"GPS extraction error for {file_path}: {str(e)}")
                 
-                # Try to get date from EXIF
-                for date_field in ['DateTimeOriginal', 'CreateDate', 'DateTimeDigitized', 'DateTime']:
-                    if date_field in exif and exif[date_field]:
-                        try:
-                            date_str = str(exif[date_field])
-                            date_taken = datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S').date()
+                # Try to get date from EXIF, most reliable field first
+                # (the capture dates live in the Exif sub-IFD, DateTime in IFD0)
+                exif_ifd = exif.get_ifd(IFD.Exif)
+                for tags, date_field in [(exif_ifd, Base.DateTimeOriginal), (exif_ifd, Base.DateTimeDigitized),
+                                         (exif, Base.DateTime)]:
+                    if tags.get(date_field):
+                        date_taken = parse_exif_date(str(tags[date_field]))
+                        if date_taken:
                             break
-                        except (ValueError, TypeError):
-                            continue
             
             return resolution, gps_coords, date_taken
 
@@ -98,41 +271,68 @@ def get_image_metadata(file_path):
         print(f"Error processing {file_path}: {str(e)}")
         return None, None, None
 
+# Common date patterns in filenames (add more patterns as needed), compiled once
+DATE_PATTERNS = [re.compile(p) for p in (
+    r'(\d{4}[-_]?\d{2}[-_]?\d{2})',  # YYYY-MM-DD or YYYYMMDD
+    r'(\d{2}[-_]?\d{2}[-_]?\d{4})',  # DD-MM-YYYY or DDMMYYYY
+    r'IMG[-_]?(\d{8})',  # IMG_YYYYMMDD
+    r'(\d{8})[-_]\d+',   # YYYYMMDD_sequence
+    r'VID[-_]?(\d{8})',  # VID_YYYYMMDD
+    r'VIDEO[-_]?(\d{8})' # VIDEO_YYYYMMDD
+)]
+# Every pattern contains a run of 4 digits, names without one cannot match
+FOUR_DIGITS_RE = re.compile(r'\d{4}')
+
 def extract_date_from_filename(filename):
     """Try to extract date from filename using common patterns."""
-    # Common date patterns in filenames (add more patterns as needed)
-    patterns = [
-        r'(\d{4}[-_]?\d{2}[-_]?\d{2})',  # YYYY-MM-DD or YYYYMMDD
-        r'(\d{2}[-_]?\d{2}[-_]?\d{4})',  # DD-MM-YYYY or DDMMYYYY
-        r'IMG[-_]?(\d{8})',  # IMG_YYYYMMDD
-        r'(\d{8})[-_]\d+',   # YYYYMMDD_sequence
-        r'VID[-_]?(\d{8})',  # VID_YYYYMMDD
-        r'VIDEO[-_]?(\d{8})' # VIDEO_YYYYMMDD
-    ]
+    if not FOUR_DIGITS_RE.search(filename):
+        return None
     
-    for pattern in patterns:
-        match = re.search(pattern, filename)
+    for pattern in DATE_PATTERNS:
+        match = pattern.search(filename)
         if match:
             date_str = match.group(1).replace('_', '').replace('-', '')
-            try:
-                # Try different date formats
-                for fmt in ('%Y%m%d', '%d%m%Y'):
-                    try:
-                        return datetime.strptime(date_str, fmt).date()
-                    except ValueError:
-                        continue
-            except ValueError:
-                continue
+            # Try YYYYMMDD then DDMMYYYY; the digits are fixed width, so slicing beats strptime
+            for year, month, day in ((date_str[0:4], date_str[4:6], date_str[6:8]),
+                                     (date_str[4:8], date_str[2:4], date_str[0:2])):
+                try:
+                    return date(int(year), int(month), int(day))
+                except ValueError:
+                    continue
+    return None
+
+def _get_video_resolution_ffprobe(file_path):
+    """Read the first video stream's resolution from the container header with ffprobe."""
+    try:
+        result = subprocess.run(
+            [FFPROBE_PATH, '-v', 'error', '-select_streams', 'v:0',
+             '-show_entries', 'stream=width,height', '-of', 'csv=s=x:p=0', file_path],
+            capture_output=True, text=True, timeout=5)
+        lines = result.stdout.strip().splitlines()
+        if lines and re.fullmatch(r'\d+x\d+', lines[0].strip()):
+            return lines[0].strip()
+    except (OSError, subprocess.SubprocessError):
+        pass
     return None
 
+_stderr_lock = threading.Lock()
+
 def get_video_metadata(file_path):
-    """Extract resolution from video file using hachoir only, skip problematic files."""
+    """Extract resolution from video file using ffprobe when available, else hachoir."""
+    if FFPROBE_PATH:
+        resolution = _get_video_resolution_ffprobe(file_path)
+        if resolution:
+            return resolution
+    
     try:
         # Only use hachoir, skip VideoFileClip due to Windows errors
+        from hachoir.parser import createParser
+        from hachoir.metadata import extractMetadata
+        
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            # Redirect stderr
-            with open(os.devnull, 'w') as devnull:
+            # Redirect stderr; fd 2 is process-wide, so threads take turns
+            with _stderr_lock, open(os.devnull, 'w') as devnull:
                 old_stderr = os.dup(2)
                 os.dup2(devnull.fileno(), 2)
                 try:
@@ -155,9 +355,11 @@ def get_video_metadata(file_path):
         return "Resolution unavailable"
 
 def get_video_gps(file_path):
-    """Extract GPS coordinates from video metadata using exifread."""
+    """Extract GPS coordinates from video metadata using hachoir."""
     try:
-        # If no GPS found with exifread, try hachoir as fallback
+        from hachoir.parser import createParser
+        from hachoir.metadata import extractMetadata
+        
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
             parser = createParser(file_path)
@@ -190,137 +392,191 @@ def get_video_gps(file_path):
         print(f"Error extracting GPS from video {file_path}: {str(e)}")
     return None
 
-def process_videos_in_parallel(video_files, max_workers=None):
-    """Process video files in parallel to get their resolutions."""
-    resolutions = {}
-    total_videos = len(video_files)
-    completed = 0
+_magic = None
 
-    print(f"\nProcessing {total_videos} videos...")
-    
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(get_video_metadata, file): file for file in video_files}
-        
-        for future in concurrent.futures.as_completed(futures):
-            file = futures[future]
-            try:
-                resolution = future.result()
-                resolutions[file] = resolution
-                
-                # Update progress without error messages
-                completed += 1
-                percentage = (completed / total_videos) * 100
-                print(f"\rVideo processing progress: {completed}/{total_videos} ({percentage:.1f}%)", 
-                      end="", flush=True)
-                
-            except Exception:
-                resolutions[file] = "Resolution unavailable"
-    
-    print("\nVideo processing completed.")
-    return resolutions
+def _get_magic():
+    """Return this process's libmagic handle, opening it on first use."""
+    global _magic
+    if _magic is None:
+        _magic = magic.Magic(mime=True)
+    return _magic
 
-def get_file_type(file_path):
+def get_file_type(file_path, strict_mime=False):
     """Determine if the file is a photo or video based on extension."""
     # Files to ignore
-    system_files = {'desktop.ini', 'thumbs.db', '.ds_store'}
-    if os.path.basename(file_path).lower() in system_files:
+    if os.path.basename(file_path).lower() in SYSTEM_FILES:
         return None
-        
-    photo_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp'}
-    video_extensions = {'.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm'}
     
-    ext = Path(file_path).suffix.lower()
+    ext = os.path.splitext(file_path)[1].lower()
     
     # Simply check extension
-    if ext in photo_extensions:
-        return 'Photo'
-    elif ext in video_extensions:
-        return 'Video'
+    if ext in PHOTO_EXTENSIONS:
+        file_type = 'Photo'
+    elif ext in VIDEO_EXTENSIONS:
+        file_type = 'Video'
+    else:
+        return None
     
-    return None
+    # Only read file contents when asked to confirm the extension
+    if strict_mime and MAGIC_AVAILABLE:
+        mime = _get_magic().from_file(file_path)
+        if not mime.startswith('image/' if file_type == 'Photo' else 'video/'):
+            return None
+    
+    return file_type
 
-def save_checkpoint(media_files, processed_files, checkpoint_file, count, enable_checkpoints=False):
-    """Save current progress to files."""
+def save_checkpoint(media_files, processed_files, new_files, checkpoint_file, count, enable_checkpoints=False):
+    """Save current progress to files, appending only the files processed since the last checkpoint."""
     if not enable_checkpoints:
         return
         
     try:
-        # Create a backup of the previous checkpoint file if it exists
-        if os.path.exists(checkpoint_file):
-            backup_file = f"{checkpoint_file}.bak"
-            os.replace(checkpoint_file, backup_file)
-
-        # Save processed files list first
-        with open(checkpoint_file, 'w', encoding='utf-8') as f:
-            for processed_file in processed_files:
-                f.write(f"{processed_file}\n")
-
-        # Save partial results to Excel with timestamp
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        excel_file = f'media_inventory_checkpoint_{count}_{timestamp}.xlsx'
-        export_to_excel(media_files, excel_file)
+        import pandas as pd
+        
+        # Append partial results to CSV, much cheaper than rewriting a workbook each time
+        write_header = not os.path.exists(CHECKPOINT_CSV)
+        pd.DataFrame(new_files, columns=INVENTORY_COLUMNS).to_csv(
+            CHECKPOINT_CSV, mode='a', header=write_header, index=False, encoding='utf-8')
+        
+        # Record the new files once their results are saved
+        with open(checkpoint_file, 'a', encoding='utf-8') as f:
+            f.writelines(f"{file_info['File Path']}\n" for file_info in new_files)
+        new_files.clear()
         
         # Create a status file to track the latest checkpoint
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
         status_file = 'inventory_status.txt'
         with open(status_file, 'w', encoding='utf-8') as f:
             f.write(f"Last checkpoint: {count}\n")
             f.write(f"Timestamp: {timestamp}\n")
-            f.write(f"Excel file: {excel_file}\n")
+            f.write(f"CSV file: {CHECKPOINT_CSV}\n")
             f.write(f"Total files processed: {len(processed_files)}\n")
             f.write(f"Total media files found: {len(media_files)}\n")
-
-        # Remove old backup file if everything succeeded
-        if os.path.exists(f"{checkpoint_file}.bak"):
-            os.remove(f"{checkpoint_file}.bak")
         
     except Exception as e:
         print(f"Error during checkpoint save: {str(e)}")
-        # Restore backup if something went wrong
-        if os.path.exists(f"{checkpoint_file}.bak"):
-            os.replace(f"{checkpoint_file}.bak", checkpoint_file)
         raise
 
+def _clean_cell(value):
+    """Remove zero-width spaces, which break some Excel readers, from text values."""
+    return value.replace('\u200b', '') if isinstance(value, str) else value
+
+def _inventory_columns(media_files):
+    """Standard column order of the present columns, plus any unexpected keys at the end."""
+    present = set().union(*media_files)
+    return ([col for col in INVENTORY_COLUMNS if col in present] +
+            sorted(present.difference(INVENTORY_COLUMNS)))
+
 def export_to_excel(media_files, output_file='media_inventory.xlsx'):
     """Export the media files information to an Excel file."""
     if media_files:
-        # Clean the data by removing or replacing problematic characters
-        cleaned_media_files = []
-        for file_info in media_files:
-            cleaned_info = {}
-            for key, value in file_info.items():
-                if isinstance(value, str):
-                    # Replace zero-width space with empty string
-                    cleaned_value = value.replace('\u200b', '')
-                    # Replace other potentially problematic characters if needed
-                    cleaned_info[key] = cleaned_value
-                else:
-                    cleaned_info[key] = value
-            cleaned_media_files.append(cleaned_info)
-
-        df = pd.DataFrame(cleaned_media_files)
+        columns = _inventory_columns(media_files)
         try:
-            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False)
+            from openpyxl import Workbook
+            
+            # A write-only workbook streams rows to disk instead of keeping every cell in memory
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet('Sheet1')
+            ws.append(columns)
+            for file_info in media_files:
+                ws.append([_clean_cell(file_info.get(col)) for col in columns])
+            wb.save(output_file)
             print(f"\nResults exported to {output_file}")
         except Exception as e:
             print(f"Error exporting to Excel: {str(e)}")
 
-# Initialize the geocoder
-geolocator = Nominatim(user_agent="media_inventory_scanner")
+def export_to_csv(media_files, output_file='media_inventory.csv'):
+    """Export the media files information to a CSV file."""
+    if media_files:
+        columns = _inventory_columns(media_files)
+        try:
+            with open(output_file, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows([file_info.get(col) for col in columns] for file_info in media_files)
+            print(f"\nResults exported to {output_file}")
+        except Exception as e:
+            print(f"Error exporting to CSV: {str(e)}")
+
+def export_to_parquet(media_files, output_file='media_inventory.parquet'):
+    """Export the media files information to a Parquet file (needs pyarrow)."""
+    if media_files:
+        try:
+            import pandas as pd
+            
+            df = pd.DataFrame(media_files, columns=_inventory_columns(media_files))
+            df.to_parquet(output_file, index=False)
+            print(f"\nResults exported to {output_file}")
+        except Exception as e:
+            print(f"Error exporting to Parquet: {str(e)}")
+            # Do not lose a long scan over a missing engine
+            export_to_csv(media_files, os.path.splitext(output_file)[0] + '.csv')
+
+EXPORTERS = {
+    'xlsx': export_to_excel,
+    'csv': export_to_csv,
+    'parquet': export_to_parquet,
+}
+
+# Rows per worksheet, header included
+EXCEL_MAX_ROWS = 1048576
+
+# Geocoder, created on first lookup
+_geolocator = None
+
+# Geocoding results persisted between runs (shared by every working directory),
+# opened on first use
+GEOCACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'media_inventory', 'geocache')
+_geo_cache = None
+
+# Nominatim usage policy: at most one request per second
+GEOCODE_MIN_INTERVAL = 1.0
+_last_geocode_request = 0.0
+
+def _get_geo_cache():
+    """Open the on-disk geocoding cache once per process."""
+    global _geo_cache
+    if _geo_cache is None:
+        os.makedirs(os.path.dirname(GEOCACHE_FILE), exist_ok=True)
+        _geo_cache = shelve.open(GEOCACHE_FILE)
+        atexit.register(_geo_cache.close)
+    return _geo_cache
+
+def _get_geolocator():
+    """Create the Nominatim geocoder once per process."""
+    global _geolocator
+    if _geolocator is None:
+        from geopy.geocoders import Nominatim
+        _geolocator = Nominatim(user_agent="media_inventory_scanner")
+    return _geolocator
+
+def _geo_cache_key(lat, lon):
+    """Cache key for coordinates already rounded to 3 decimals."""
+    return f"{lat},{lon}"
 
-@lru_cache(maxsize=1000)
 def get_location_info(lat, lon):
-    """Get country and city from coordinates using caching to avoid duplicate requests."""
+    """Get country and city from coordinates using a persistent cache to avoid duplicate requests."""
+    # Round coordinates to 3 decimal places (about 100m accuracy)
+    # This helps with caching nearby locations
+    lat = round(float(lat), 3)
+    lon = round(float(lon), 3)
+    
+    geo_cache = _get_geo_cache()
+    key = _geo_cache_key(lat, lon)
+    if key in geo_cache:
+        return geo_cache[key]
+    
     try:
-        # Round coordinates to 3 decimal places (about 100m accuracy)
-        # This helps with caching nearby locations
-        lat = round(float(lat), 3)
-        lon = round(float(lon), 3)
-        
-        # Add a small delay to respect rate limits
-        sleep(1)
+        # Respect the rate limit (only for real requests); time spent since the
+        # previous request, including its own round trip, counts towards it
+        global _last_geocode_request
+        wait = GEOCODE_MIN_INTERVAL - (time.monotonic() - _last_geocode_request)
+        if wait > 0:
+            sleep(wait)
+        _last_geocode_request = time.monotonic()
         
-        location = geolocator.reverse(f"{lat}, {lon}", language="en")
+        location = _get_geolocator().reverse(f"{lat}, {lon}", language="en")
+        country, city = '', ''
         if location and location.raw.get('address'):
             address = location.raw['address']
             country = address.get('country', '')
@@ -331,62 +587,58 @@ def get_location_info(lat, lon):
                    address.get('suburb') or 
                    address.get('municipality') or
                    '')
-            return country, city
-    except (GeocoderTimedOut, Exception) as e:
+        # Cache places without an address too (e.g. open sea) so they are not asked again;
+        # errors are not cached since they are usually transient
+        geo_cache[key] = (country, city)
+        geo_cache.sync()
+        return country, city
+    except Exception as e:
         print(f"Geocoding error for coordinates ({lat}, {lon}): {str(e)}")
     return '', ''
 
-def process_gps_batch(media_files, lookup_locations=False, batch_size=50):
-    """Process GPS coordinates in batches to update location information."""
+def process_gps_batch(media_files, lookup_locations=False):
+    """Resolve country and city once per unique location and update the media files."""
     if not lookup_locations:
         return
 
-    batch = []
-    locations_cache = {}
-    
+    # Group files by rounded coordinates so each location is only looked up once
+    files_by_location = {}
     for file_info in media_files:
         if 'GPS Coordinates' in file_info and file_info['GPS Coordinates']:
             try:
                 lat, lon = map(float, file_info['GPS Coordinates'].split(','))
-                batch.append((file_info, lat, lon))
-                
-                if len(batch) >= batch_size:
-                    process_location_batch(batch, locations_cache)
-                    batch = []
+                key = (round(lat, 3), round(lon, 3))
+                files_by_location.setdefault(key, []).append(file_info)
             except Exception as e:
                 print(f"Error parsing GPS coordinates for {file_info['File Name']}: {str(e)}")
-    
-    if batch:
-        process_location_batch(batch, locations_cache)
 
-def process_location_batch(batch, locations_cache):
-    """Process a batch of locations and update the media files with country and city."""
-    for file_info, lat, lon in batch:
-        # Check if we have cached the location
-        cache_key = f"{round(lat, 3)},{round(lon, 3)}"
-        if cache_key in locations_cache:
-            country, city = locations_cache[cache_key]
-        else:
-            country, city = get_location_info(lat, lon)
-            locations_cache[cache_key] = (country, city)
-        
-        file_info['Country'] = country
-        file_info['City'] = city
+    # Resolve every unique location once, cached ones first, then broadcast to its files
+    geo_cache = _get_geo_cache()
+    cached = [key for key in files_by_location if _geo_cache_key(*key) in geo_cache]
+    pending = [key for key in files_by_location if _geo_cache_key(*key) not in geo_cache]
+    print(f"Found {len(files_by_location)} unique locations: {len(cached)} cached, "
+          f"{len(pending)} to look up (about {len(pending) * GEOCODE_MIN_INTERVAL:.0f}s)")
+    
+    for idx, (lat, lon) in enumerate(cached + pending, 1):
+        country, city = get_location_info(lat, lon)
+        for file_info in files_by_location[(lat, lon)]:
+            file_info['Country'] = country
+            file_info['City'] = city
+        if idx > len(cached):
+            print(f"\rLocation lookups: {idx - len(cached)}/{len(pending)}", end="", flush=True)
+    if pending:
+        print()
 
-def get_duplicate_status(filename, filesize, file_registry):
+def get_duplicate_status(filename, filesize, seen_names, seen_pairs):
     """Determine if a file is a duplicate based on name and size."""
-    if filename not in file_registry:
-        file_registry[filename] = {'sizes': set(), 'count': 0}
-        file_registry[filename]['sizes'].add(filesize)
-        file_registry[filename]['count'] += 1
-        return 'ok'
-    else:
-        file_registry[filename]['count'] += 1
-        if filesize in file_registry[filename]['sizes']:
-            return 'duplicate'
-        else:
-            file_registry[filename]['sizes'].add(filesize)
-            return 'error'
+    key = (filename, filesize)
+    if key in seen_pairs:
+        return 'duplicate'
+    seen_pairs.add(key)
+    if filename in seen_names:
+        return 'error'
+    seen_names.add(filename)
+    return 'ok'
 
 def is_file_in_correct_location(file_path, file_date):
     """Check if file is already in the correct year-month folder structure."""
@@ -402,7 +654,122 @@ def is_file_in_correct_location(file_path, file_date):
     except Exception:
         return False
 
-def scan_directories(root_dirs, lookup_locations=False, max_workers=8, test_limit=None, enable_checkpoints=False):
+def _process_one(file_data, strict_mime=False):
+    """Build the inventory record for a single file (runs in a worker process)."""
+    try:
+        file_path = file_data['file_path']
+        file_type = get_file_type(file_path, strict_mime)
+        if not file_type:
+            return None
+        
+        file_stats = file_data['stat']
+        file_size_bytes = file_stats.st_size
+        
+        # Get file dates
+        creation_date = datetime.fromtimestamp(file_stats.st_ctime).date()
+        modified_date = datetime.fromtimestamp(file_stats.st_mtime).date()
+        
+        # Build base file info (duplicate status is filled in by the caller)
+        file_info = {
+            'File Path': file_path,
+            'File Name': file_data['file_name'],
+            'Directory': file_data['root'],
+            'Type': file_type,
+            'Size (Bytes)': file_size_bytes,
+            'Size (MB)': round(file_size_bytes / (1024 * 1024), 2),
+            'Creation Date': creation_date,
+            'Modified Date': modified_date,
+            'Duplicate Status': None,
+            'Move Status': 'To Be Determined'  # New field
+        }
+        
+        # Process type-specific metadata
+        if file_type == 'Photo':
+            resolution, gps, photo_date = get_image_metadata(file_path)
+            file_info['Resolution'] = resolution
+            file_info['GPS Coordinates'] = gps
+            file_info['Photo Date'] = (photo_date or 
+                                     extract_date_from_filename(file_data['file_name']) or 
+                                     min(creation_date, modified_date))
+        else:  # Video
+            file_info['Resolution'] = get_video_metadata(file_path)
+            file_info['Photo Date'] = extract_date_from_filename(file_data['file_name'])
+        
+        # Check if file is already in correct location
+        if is_file_in_correct_location(file_path, file_info['Photo Date']):
+            file_info['Move Status'] = 'Already in Place'
+        else:
+            file_info['Move Status'] = 'Need to Move'
+        
+        return file_info
+    
+    except Exception as e:
+        print(f"\nSkipping {file_data['file_name']}: {str(e)}")
+        return None
+
+# Order files within a directory roughly as they sit on disk: inode numbers
+# come free with readdir on POSIX, while on Windows inode() costs a stat call
+# and NTFS keeps directory entries sorted by name anyway
+_disk_order_key = (lambda entry: entry.name) if os.name == 'nt' else (lambda entry: entry.inode())
+
+def _scan(path):
+    """Yield DirEntry objects for regular files under path."""
+    # Explicit stack: nested generators would pass every entry up through
+    # one frame per directory level
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        files = []
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        files.append(entry)
+        except OSError as e:
+            print(f"Warning: Cannot read directory {current}: {str(e)}")
+        files.sort(key=_disk_order_key)
+        yield from files
+
+def _walk_media_files(root_dirs, processed_files, out_queue):
+    """Put a file_data dict on out_queue for each new media file, then None."""
+    try:
+        for root_dir in root_dirs:
+            if not os.path.exists(root_dir):
+                print(f"Warning: Directory not found: {root_dir}")
+                continue
+
+            print(f"Scanning: {root_dir}")
+            for entry in _scan(root_dir):
+                name_lower = entry.name.lower()
+                # Skip system files
+                if name_lower in SYSTEM_FILES:
+                    continue
+
+                # Check extension
+                if not name_lower.endswith(MEDIA_EXTENSIONS_TUPLE):
+                    continue
+
+                file_path = entry.path
+                if file_path not in processed_files:
+                    try:
+                        # DirEntry caches stat results, so size and dates cost no extra syscall
+                        file_stats = entry.stat()
+                    except OSError as e:
+                        print(f"Error accessing {file_path}: {str(e)}")
+                        continue
+                    out_queue.put({
+                        'file_path': file_path,
+                        'file_name': entry.name,
+                        'root': os.path.dirname(file_path),
+                        'stat': file_stats
+                    })
+    finally:
+        out_queue.put(None)
+
+def scan_directories(root_dirs, lookup_locations=False, max_workers=8, test_limit=None, enable_checkpoints=False,
+                     use_threads=False, strict_mime=False):
     """Scan directories recursively for media files."""
     print("\n=== Photo Inventory Process Started ===")
     print("Initializing...")
@@ -419,146 +786,86 @@ def scan_directories(root_dirs, lookup_locations=False, max_workers=8, test_limi
     if enable_checkpoints and os.path.exists(checkpoint_file):
         print("Loading previously processed files...")
         with open(checkpoint_file, 'r', encoding='utf-8') as f:
-            processed_files = set(line.strip() for line in f)
+            # One bulk read and split instead of a Python-level loop over lines
+            processed_files = set(f.read().splitlines())
+        processed_files.discard('')
         print(f"Found {len(processed_files)} previously processed files")
     
-    # Scan for media files
+    # Walk in a background thread so the pool starts on the first files
+    # while the rest of the tree is still being listed
     print("\nScanning directories for files...")
+    file_queue = queue.Queue(maxsize=1024)
+    walker = threading.Thread(target=_walk_media_files, args=(root_dirs, processed_files, file_queue),
+                              daemon=True)
+    walker.start()
+    
     files_to_process = []
+    files_found = 0
     
-    # Files to ignore
-    system_files = {'desktop.ini', 'thumbs.db', '.ds_store'}
-    valid_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp',
-                       '.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm'}
-    
-    for root_dir in root_dirs:
-        if not os.path.exists(root_dir):
-            print(f"Warning: Directory not found: {root_dir}")
-            continue
-            
-        print(f"Scanning: {root_dir}")
-        for root, _, files in os.walk(root_dir):
-            for file in files:
-                # Skip system files
-                if file.lower() in system_files:
-                    continue
-                    
-                # Check extension
-                if not any(file.lower().endswith(ext) for ext in valid_extensions):
-                    continue
-                    
-                file_path = os.path.join(root, file)
-                if file_path not in processed_files:
-                    files_to_process.append({
-                        'file_path': file_path,
-                        'file_name': file,
-                        'root': root
-                    })
+    def queued_files():
+        """Yield walked files up to the test limit, counting all of them."""
+        nonlocal files_found
+        for file_data in iter(file_queue.get, None):
+            files_found += 1
+            if test_limit and len(files_to_process) >= test_limit:
+                continue  # Keep draining so the walker can finish
+            files_to_process.append(file_data)
+            yield file_data
     
-    total_files = len(files_to_process)
-    print(f"\nFound {total_files} new media files to process")
+    # Names and (name, size) pairs seen so far, for duplicate tracking
+    seen_names = set()
+    seen_pairs = set()
+    # Records processed since the last checkpoint
+    new_files = []
     
-    if total_files > 0:
-        print("\nProcessing files...")
-        
-        # Initialize file registry for duplicate tracking
-        file_registry = {}
-        media_files = []
+    # First pass: extract metadata in worker processes (or threads), track duplicates here.
+    # Threads skip process startup and pickling, which pays off when reads dominate.
+    if use_threads:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or os.cpu_count())
+    else:
+        # Spawn, not fork: the walker thread is already running and printing, and a forked
+        # worker could inherit one of its locks held (stdout, the queue)
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                                                          mp_context=multiprocessing.get_context('spawn'))
+    with executor:
+        # map() submits chunks as the walk produces them and returns once it is done
+        results = executor.map(functools.partial(_process_one, strict_mime=strict_mime),
+                               queued_files(), chunksize=64)
+        total_files = len(files_to_process)
+        print(f"\nFound {files_found} new media files to process")
+        if total_files > 0:
+            print("\nProcessing files...")
         
-        # First pass: Process file metadata and duplicates
-        for idx, file_data in enumerate(files_to_process, 1):
-            try:
-                if test_limit and idx > test_limit:
-                    print(f"\nTest limit of {test_limit} files reached. Stopping...")
-                    break
-                
-                file_path = file_data['file_path']
-                file_type = get_file_type(file_path)
-                
-                if file_type:
-                    file_size_bytes = os.path.getsize(file_path)
-                    file_stats = os.stat(file_path)
-                    
-                    # Get file dates
-                    creation_date = datetime.fromtimestamp(file_stats.st_ctime).date()
-                    modified_date = datetime.fromtimestamp(file_stats.st_mtime).date()
-                    
-                    # Check duplicate status first
-                    duplicate_status = get_duplicate_status(file_data['file_name'], file_size_bytes, file_registry)
-                    
-                    # Build base file info
-                    file_info = {
-                        'File Path': file_path,
-                        'File Name': file_data['file_name'],
-                        'Directory': file_data['root'],
-                        'Type': file_type,
-                        'Size (Bytes)': file_size_bytes,
-                        'Size (MB)': round(file_size_bytes / (1024 * 1024), 2),
-                        'Creation Date': creation_date,
-                        'Modified Date': modified_date,
-                        'Duplicate Status': duplicate_status,
-                        'Move Status': 'To Be Determined'  # New field
-                    }
-                    
-                    # Process type-specific metadata
-                    if file_type == 'Photo':
-                        resolution, gps, photo_date = get_image_metadata(file_path)
-                        file_info['Resolution'] = resolution
-                        file_info['GPS Coordinates'] = gps
-                        file_info['Photo Date'] = (photo_date or 
-                                                 extract_date_from_filename(file_data['file_name']) or 
-                                                 min(creation_date, modified_date))
-                        
-                        # Check if file is already in correct location
-                        if is_file_in_correct_location(file_path, file_info['Photo Date']):
-                            file_info['Move Status'] = 'Already in Place'
-                        else:
-                            file_info['Move Status'] = 'Need to Move'
-                            
-                    else:  # Video
-                        file_info['Resolution'] = None  # Will be updated later
-                        file_info['Photo Date'] = extract_date_from_filename(file_data['file_name'])
-                        
-                        # Check if file is already in correct location
-                        if is_file_in_correct_location(file_path, file_info['Photo Date']):
-                            file_info['Move Status'] = 'Already in Place'
-                        else:
-                            file_info['Move Status'] = 'Need to Move'
-
-                    
-                    media_files.append(file_info)
-                    processed_files.add(file_path)
-                    files_processed += 1
-                
-                # Update progress
+        last_print = 0.0
+        for idx, (file_data, file_info) in enumerate(zip(files_to_process, results), 1):
+            if file_info:
+                # Duplicate detection needs the shared sets, so it stays in this process
+                file_info['Duplicate Status'] = get_duplicate_status(
+                    file_info['File Name'], file_info['Size (Bytes)'], seen_names, seen_pairs)
+                media_files.append(file_info)
+                processed_files.add(file_info['File Path'])
+                new_files.append(file_info)
+                files_processed += 1
+            
+            # Update progress at most every PROGRESS_INTERVAL seconds to limit console writes
+            now = time.monotonic()
+            if now - last_print >= PROGRESS_INTERVAL or idx == total_files:
+                last_print = now
                 percentage = (idx / total_files) * 100
                 print(f"\rProcessed: {idx}/{total_files} ({percentage:.1f}%) - Current: {file_data['file_name']}", 
                       end="", flush=True)
-                
-                # Checkpoint every 1000 files if enabled
-                if enable_checkpoints and idx % 1000 == 0:
-                    print(f"\nSaving checkpoint at {idx} files...")
-                    save_checkpoint(media_files, processed_files, checkpoint_file, idx, enable_checkpoints)
-                    print("Continuing...")
-                
-            except Exception as e:
-                print(f"\nSkipping {file_data['file_name']}: {str(e)}")
-                continue
-        
-        # Process video resolutions in parallel
-        video_files = [(file_info, file_info['File Path']) 
-                      for file_info in media_files 
-                      if file_info['Type'] == 'Video']
-        
-        if video_files:
-            print("\nProcessing video resolutions in parallel...")
-            video_paths = [v[1] for v in video_files]
-            resolutions = process_videos_in_parallel(video_paths, max_workers)
             
-            # Update video resolutions in media_files
-            for file_info, file_path in video_files:
-                file_info['Resolution'] = resolutions.get(file_path)
-
+            # Checkpoint every 1000 files if enabled
+            if enable_checkpoints and idx % 1000 == 0:
+                print(f"\nSaving checkpoint at {idx} files...")
+                save_checkpoint(media_files, processed_files, new_files, checkpoint_file, idx, enable_checkpoints)
+                print("Continuing...")
+    walker.join()
+    
+    if total_files > 0:
+        if files_found > total_files:
+            print(f"\nTest limit of {test_limit} files reached. Stopping...")
+        
         # Second pass: Process GPS coordinates if enabled
         if media_files and lookup_locations:
             print("\nProcessing location information...")
@@ -567,7 +874,7 @@ def scan_directories(root_dirs, lookup_locations=False, max_workers=8, test_limi
         # Save final results if checkpoints are enabled
         if enable_checkpoints:
             print("\nSaving final results...")
-            save_checkpoint(media_files, processed_files, checkpoint_file, files_processed, enable_checkpoints)
+            save_checkpoint(media_files, processed_files, new_files, checkpoint_file, files_processed, enable_checkpoints)
         print("\n=== Process Completed Successfully ===")
         print(f"Total files processed: {files_processed}")
         print(f"Media files found: {len(media_files)}")
@@ -599,8 +906,15 @@ def main():
     parser.add_argument('--dirs', nargs='+', help='Directories to scan (optional)')
     parser.add_argument('--lookup-locations', action='store_true', help='Enable GPS location lookup (slower processing)')
     parser.add_argument('--enable-checkpoints', action='store_true', help='Enable writing checkpoint files to disk')
+    parser.add_argument('--threads', action='store_true', help='Extract metadata with threads instead of processes (e.g. for network drives)')
+    parser.add_argument('--output-format', choices=sorted(EXPORTERS), default='xlsx',
+                        help='Inventory file format (default: xlsx; csv is used when there are too many rows for Excel)')
+    parser.add_argument('--strict-mime', action='store_true', help='Confirm each file type with libmagic (reads every file, slower)')
     args = parser.parse_args()
     
+    if args.strict_mime and not MAGIC_AVAILABLE:
+        print("Warning: python-magic not available. File types will be taken from extensions only.")
+    
     # Define default directories
     default_directories = [
     #
@@ -635,13 +949,20 @@ def main():
         directories_to_scan, 
         lookup_locations=args.lookup_locations, 
         test_limit=args.test,
-        enable_checkpoints=args.enable_checkpoints
+        enable_checkpoints=args.enable_checkpoints,
+        use_threads=args.threads,
+        strict_mime=args.strict_mime
     )
     
     if media_files:
-        export_to_excel(media_files, 'media_inventory.xlsx')
-        print(f"\nInventory has been exported to 'media_inventory.xlsx'")
-        print("You can find the following information in the Excel file:")
+        output_format = args.output_format
+        if output_format == 'xlsx' and len(media_files) >= EXCEL_MAX_ROWS:
+            print(f"\nWarning: {len(media_files)} files do not fit in an Excel sheet, writing CSV instead")
+            output_format = 'csv'
+        output_file = f'media_inventory.{output_format}'
+        EXPORTERS[output_format](media_files, output_file)
+        print(f"\nInventory has been exported to '{output_file}'")
+        print("You can find the following information in the file:")
         print("- File names")
         print("- Directory paths")
         print("- Media types (Photo/Video)")
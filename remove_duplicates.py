@@ -3,10 +3,17 @@ import argparse
 import hashlib
 from pathlib import Path
 from collections import defaultdict
-import random
+from concurrent.futures import ThreadPoolExecutor
 import configparser
 from typing import List
 
+# BLAKE3 is SIMD accelerated; MD5 is only the fallback when it is not installed
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
 def setup_parser():
     """Configure command line arguments."""
     parser = argparse.ArgumentParser(description='Find and remove duplicate files')
@@ -31,41 +38,68 @@ def load_config(config_file='config.ini') -> List[str]:
     
     return directories
 
-def calculate_quick_hash(file_path, chunk_size=4096):
-    """Calculate MD5 hash of first and last chunk of file for quick comparison."""
-    hash_md5 = hashlib.md5()
-    file_size = os.path.getsize(file_path)
+def calculate_quick_hash(file_path, chunk_size=65536):
+    """Calculate a hash of first and last chunk of file for quick comparison."""
+    file_hash = blake3.blake3() if BLAKE3_AVAILABLE else hashlib.md5()
     
     with open(file_path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        
         # Read first chunk
         data = f.read(chunk_size)
-        hash_md5.update(data)
+        file_hash.update(data)
         
-        # If file is larger than chunk_size * 2, read last chunk
-        if file_size > chunk_size * 2:
-            f.seek(-chunk_size, 2)  # Seek from end
-            data = f.read(chunk_size)
-            hash_md5.update(data)
+        # If file is larger than chunk_size, read the rest up to one more chunk from the end
+        if file_size > chunk_size:
+            offset = max(chunk_size, file_size - chunk_size)
+            if hasattr(os, 'pread'):
+                # One positioned read instead of seek + read (not available on Windows)
+                data = os.pread(f.fileno(), chunk_size, offset)
+            else:
+                f.seek(offset)
+                data = f.read(chunk_size)
+            file_hash.update(data)
             
-    return hash_md5.hexdigest()
+    return file_hash.hexdigest()
+
+def iter_files(root):
+    """Yield (path, size) for every regular file under root."""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        # DirEntry.stat() is free on Windows and a single stat elsewhere
+                        try:
+                            yield entry.path, entry.stat().st_size
+                        except OSError as e:
+                            print(f"Error accessing {entry.path}: {e}")
+        except OSError as e:
+            print(f"Error accessing {current}: {e}")
+
+def _quick_hash_or_none(file_path):
+    """Quick hash of a file, or None (with a message) if it cannot be read."""
+    try:
+        return calculate_quick_hash(file_path)
+    except OSError as e:
+        print(f"Error hashing {file_path}: {e}")
+        return None
 
 def find_duplicates(directories):
-    """Find duplicate files based on size and quick hash."""
+    """Find duplicate files based on size and quick hash, as (size, paths) groups."""
     # First pass: Group files by size
     size_groups = defaultdict(list)
     total_files = 0
     
     print("\nScanning directories for files...")
     for directory in directories:
-        for root, _, files in os.walk(directory):
-            for filename in files:
-                filepath = os.path.join(root, filename)
-                try:
-                    file_size = os.path.getsize(filepath)
-                    size_groups[file_size].append(filepath)
-                    total_files += 1
-                except OSError as e:
-                    print(f"Error accessing {filepath}: {e}")
+        for filepath, file_size in iter_files(directory):
+            size_groups[file_size].append(filepath)
+            total_files += 1
     
     print(f"\nFound {total_files} files")
     
@@ -74,36 +108,33 @@ def find_duplicates(directories):
     groups_to_check = {size: paths for size, paths in size_groups.items() if len(paths) > 1}
     print(f"Found {len(groups_to_check)} groups of files with same size")
     
-    for size, file_paths in groups_to_check.items():
-        hash_groups = defaultdict(list)
-        
-        # Calculate quick hash for each file
-        for file_path in file_paths:
-            try:
-                file_hash = calculate_quick_hash(file_path)
-                hash_groups[file_hash].append(file_path)
-            except OSError as e:
-                print(f"Error hashing {file_path}: {e}")
-        
-        # Add groups with same hash to duplicates
-        for files in hash_groups.values():
-            if len(files) > 1:
-                duplicates.append(files)
+    # Hashing is mostly waiting on reads, so overlap them across threads
+    candidates = [(size, path) for size, paths in groups_to_check.items() for path in paths]
+    hash_groups = defaultdict(list)
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        hashes = executor.map(_quick_hash_or_none, [path for _, path in candidates])
+        for (size, file_path), file_hash in zip(candidates, hashes):
+            if file_hash is not None:
+                hash_groups[(size, file_hash)].append(file_path)
+    
+    # Add groups with same size and hash to duplicates, keeping the size from the walk
+    for (size, _), files in hash_groups.items():
+        if len(files) > 1:
+            duplicates.append((size, files))
     
     return duplicates
 
 def choose_file_to_remove(file_group):
     """Choose which file to remove from a group of duplicates."""
-    # Find files with underscore in name
-    files_with_underscore = [f for f in file_group if '_' in os.path.basename(f)]
-    if files_with_underscore:
-        # Sort by number of underscores (prefer files with more underscores)
-        files_with_underscore.sort(key=lambda x: os.path.basename(x).count('_'), reverse=True)
-        return files_with_underscore[0]  # Return file with most underscores
-    
-    # If no files with underscore, choose randomly but warn
-    chosen = random.choice(file_group)
-    print(f"Warning: No underscore pattern found in group, randomly selecting: {chosen}")
+    # Count underscores in each name (prefer files with more underscores)
+    underscores = [os.path.basename(f).count('_') for f in file_group]
+    if any(underscores):
+        # max() keeps the first of equally ranked files, as the stable sort did
+        return max(zip(file_group, underscores), key=lambda item: item[1])[0]
+    
+    # If no files with underscore, choose the first path in sorted order but warn
+    chosen = min(file_group)
+    print(f"Warning: No underscore pattern found in group, selecting: {chosen}")
     return chosen
 
 def main():
@@ -148,9 +179,8 @@ def main():
     
     # Process duplicates
     total_space = 0
-    for group in duplicate_groups:
+    for file_size, group in duplicate_groups:
         file_to_remove = choose_file_to_remove(group)
-        file_size = os.path.getsize(file_to_remove)
         total_space += file_size
         
         print(f"\nDuplicate group (size: {file_size:,} bytes):")
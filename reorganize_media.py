@@ -4,6 +4,7 @@ from pathlib import Path
 import argparse
 import shutil
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 def setup_parser():
     """Configure command line arguments."""
@@ -13,13 +14,37 @@ def setup_parser():
     parser.add_argument('--root', type=str, default=os.path.join('organized_media'),
                        help='Root directory for organized files (default: organized_media)')
     parser.add_argument('--inventory', type=str, default=os.path.join('media_inventory.xlsx'),
-                       help='Path to the media inventory Excel file (default: media_inventory.xlsx)')
+                       help='Path to the media inventory file, .xlsx, .csv or .parquet (default: media_inventory.xlsx)')
+    parser.add_argument('--moves-format', choices=['xlsx', 'parquet'], default='xlsx',
+                       help='Format of the planned moves file written on dry runs (default: xlsx)')
+    parser.add_argument('--workers', type=int, default=8,
+                       help='Number of files copied in parallel with --prod (default: 8)')
     return parser
 
+# Inventory columns used for planning; text columns are read as strings without inference
+INVENTORY_COLUMNS = ['File Path', 'Photo Date', 'Duplicate Status', 'Country', 'City']
+TEXT_DTYPES = {col: 'string' for col in ['File Path', 'Duplicate Status', 'Country', 'City']}
+
+def _read_inventory(file_path):
+    """Read the planning columns of an Excel, CSV or Parquet inventory."""
+    ext = os.path.splitext(file_path)[1].lower()
+    usecols = lambda col: col in INVENTORY_COLUMNS
+    if ext == '.csv':
+        return pd.read_csv(file_path, usecols=usecols, dtype=TEXT_DTYPES)
+    if ext == '.parquet':
+        df = pd.read_parquet(file_path)
+        return df[[col for col in df.columns if col in INVENTORY_COLUMNS]]
+    
+    # calamine (python-calamine) reads workbooks much faster than openpyxl when installed
+    try:
+        return pd.read_excel(file_path, engine='calamine', usecols=usecols, dtype=TEXT_DTYPES)
+    except (ImportError, ValueError):
+        return pd.read_excel(file_path, usecols=usecols, dtype=TEXT_DTYPES)
+
 def load_inventory(file_path):
-    """Load and validate the media inventory Excel file."""
+    """Load and validate the media inventory file (Excel, CSV or Parquet)."""
     try:
-        df = pd.read_excel(file_path)
+        df = _read_inventory(file_path)
         required_columns = ['File Path', 'Photo Date', 'Duplicate Status']  # Removed Move Status
         missing_columns = [col for col in required_columns if col not in df.columns]
         
@@ -31,30 +56,69 @@ def load_inventory(file_path):
             if col not in df.columns:
                 df[col] = pd.NA
         
+        # Normalize text once here instead of per row while planning
+        df['Duplicate Status'] = df['Duplicate Status'].astype('string').str.lower()
+        df['Country'] = df['Country'].astype('string').str.strip()
+        df['City'] = df['City'].astype('string').str.strip()
+        
         return df
     except Exception as e:
         print(f"Error loading inventory file: {e}")
         return None
 
-def plan_file_moves(df, root_dir):
-    """Plan file moves based on dates and location."""
-    moves = []
-    errors = []
-    status_counts = {
+def _list_names(directory):
+    """Return the case-normalized names in a directory, or an empty set if it does not exist."""
+    try:
+        with os.scandir(directory) as it:
+            return {os.path.normcase(entry.name) for entry in it}
+    except OSError:
+        return set()
+
+def new_status_counts():
+    """Return the zeroed counters filled in while planning."""
+    return {
         'ok': 0, 
         'duplicate': 0, 
         'error': 0,
         'skipped': 0,
         'default_date': 0  # Count files using default date
     }
-    
+
+def iter_file_moves(df, root_dir, errors, status_counts):
+    """Yield planned (source, target, status) moves for df as returned by load_inventory, recording errors and counts as it goes."""
     # Default date for files without valid dates
-    DEFAULT_DATE = pd.Timestamp('1980-01-01').date()
+    DEFAULT_DATE = '1980-01-01'
+    
+    # Work out every target directory column-wise; only the filesystem checks stay per file
+    photo_dates = pd.to_datetime(df['Photo Date'], errors='coerce', format='mixed')
+    date_missing = photo_dates.isna()
+    date_strs = photo_dates.dt.strftime('%Y-%m-%d').fillna(DEFAULT_DATE)
+    years = date_strs.str[:4]
+    
+    # Add location information to date directory if available
+    city = df['City']
+    country = df['Country']
+    foreign = (country.notna() & country.str.lower().ne('france')).fillna(False)
+    location = ('_' + country + '_' + city).where(foreign, '_' + city).where(city.notna(), '')
+    
+    # Create target path (only 2 levels: year/date_location); join the root once, then concatenate
+    root_prefix = os.path.join(root_dir, '')
+    target_dirs = root_prefix + years + os.sep + date_strs + location.fillna('')
+    # Many files share a folder, so normalize each distinct one once
+    norm_target_dirs = {target_dir: os.path.normpath(target_dir) for target_dir in target_dirs.unique()}
     
-    for _, row in df.iterrows():
+    # Names in each source directory, and names present or planned in each target directory
+    source_names = {}
+    target_names = {}
+    # Next collision counter to try, per target directory and file name
+    next_counter = {}
+    
+    for source_path, duplicate_status, target_dir, no_date in zip(
+            df['File Path'], df['Duplicate Status'], target_dirs, date_missing):
         try:
-            source_path = row['File Path']
-            duplicate_status = row['Duplicate Status'].lower()
+            if pd.isna(duplicate_status):
+                errors.append(f"Error processing {source_path}: no Duplicate Status")
+                continue
             
             # Update duplicate status counts
             status_counts[duplicate_status] = status_counts.get(duplicate_status, 0) + 1
@@ -63,38 +127,21 @@ def plan_file_moves(df, root_dir):
             if duplicate_status == 'duplicate':
                 continue
                 
-            if not os.path.exists(source_path):
+            # Check the source against a listing of its directory, taken once per directory
+            source_dir, filename = os.path.split(source_path)
+            names = source_names.get(source_dir)
+            if names is None:
+                names = source_names[source_dir] = _list_names(source_dir or os.curdir)
+            if os.path.normcase(filename) not in names:
                 errors.append(f"Source file not found: {source_path}")
                 continue
             
-            # Convert date to required format with fallback
-            try:
-                photo_date = pd.to_datetime(row['Photo Date']).date()
-                if pd.isna(photo_date):
-                    photo_date = DEFAULT_DATE
-                    status_counts['default_date'] += 1
-            except (ValueError, AttributeError):
-                photo_date = DEFAULT_DATE
+            if no_date:
                 status_counts['default_date'] += 1
             
-            year = str(photo_date.year)
-            date_str = photo_date.strftime('%Y-%m-%d')
-            
-            # Add location information to date directory if available
-            if pd.notna(row['City']):
-                if pd.notna(row['Country']) and row['Country'].strip().lower() != 'france':
-                    date_str = f"{date_str}_{row['Country'].strip()}_{row['City'].strip()}"
-                else:
-                    date_str = f"{date_str}_{row['City'].strip()}"
-            
-            # Create target path (only 2 levels: year/date_location)
-            target_dir = os.path.join(root_dir, year, date_str)
-            filename = os.path.basename(source_path)
-            target_path = os.path.join(target_dir, filename)
-            
             # Fix: Normalize paths and do strict comparison
-            source_dir = os.path.normpath(os.path.dirname(source_path))
-            norm_target_dir = os.path.normpath(target_dir)
+            source_dir = os.path.normpath(source_dir)
+            norm_target_dir = norm_target_dirs[target_dir]
             
             # Skip if already in correct location - must be before any filename modifications
             if source_dir == norm_target_dir:
@@ -106,37 +153,47 @@ def plan_file_moves(df, root_dir):
             if duplicate_status == 'error':
                 base_name, ext = os.path.splitext(filename)
                 filename = f"{base_name}_dup{ext}"
-                target_path = os.path.join(target_dir, filename)
             
-            # Handle filename collisions for files that will be moved
-            counter = 1
-            while os.path.exists(target_path):
+            # Handle filename collisions, with files already there and with earlier planned moves
+            names = target_names.get(target_dir)
+            if names is None:
+                names = target_names[target_dir] = _list_names(target_dir)
+            new_filename = filename
+            if os.path.normcase(new_filename) in names:
+                # Names only get taken, so resume from the last counter used for this name
+                counter_key = (target_dir, os.path.normcase(filename))
+                counter = next_counter.get(counter_key, 1)
                 base_name, ext = os.path.splitext(filename)
                 new_filename = f"{base_name}_{counter}{ext}"
-                target_path = os.path.join(target_dir, new_filename)
-                counter += 1
+                while os.path.normcase(new_filename) in names:
+                    counter += 1
+                    new_filename = f"{base_name}_{counter}{ext}"
+                next_counter[counter_key] = counter + 1
+            names.add(os.path.normcase(new_filename))
+            target_path = target_dir + os.sep + new_filename
             
             # Only add to moves if not skipped
-            moves.append((source_path, target_path, duplicate_status))
+            yield source_path, target_path, duplicate_status
             
         except Exception as e:
-            errors.append(f"Error processing {row['File Path']}: {str(e)}")
-    
-    return moves, errors, status_counts
+            errors.append(f"Error processing {source_path}: {str(e)}")
 
-def execute_moves(moves, dry_run=True):
-    """Execute or simulate file moves."""
+def execute_moves(moves, dry_run=True, max_workers=8):
+    """Execute or simulate file moves, starting each copy as soon as its move arrives."""
     results = {
         'successful': 0,
         'failed': 0,
         'skipped': 0,  # Add skipped counter
         'errors': [],
-        'moves_df': pd.DataFrame([(s, d, st) for s, d, st in moves], 
-                               columns=['Source', 'Destination', 'Status'])
     }
     
-    for source, target, status in moves:
-        try:
+    planned = []
+    created_dirs = set()
+    futures = {}
+    # Copies are I/O bound, so overlap them on threads (and with the planning feeding them)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for source, target, status in moves:
+            planned.append((source, target, status))
             source_dir = os.path.dirname(source)
             target_dir = os.path.dirname(target)
             
@@ -149,18 +206,30 @@ def execute_moves(moves, dry_run=True):
                 
             if dry_run:
                 print(f"Would move ({status}):\n  From: {source}\n  To: {target}")
-            else:
-                os.makedirs(target_dir, exist_ok=True)
-                print(f"Moving ({status}):\n  From: {source}\n  To: {target}")
-                shutil.copy2(source, target)
+                continue
+            
+            # Create each target directory once, before its first copy
+            if target_dir not in created_dirs:
+                created_dirs.add(target_dir)
+                try:
+                    os.makedirs(target_dir, exist_ok=True)
+                except OSError as e:
+                    print(f"Error creating {target_dir}: {str(e)}")
+            futures[executor.submit(shutil.copy2, source, target)] = (source, target, status)
+        
+        for future in as_completed(futures):
+            source, target, status = futures[future]
+            try:
+                future.result()
+                print(f"Moved ({status}):\n  From: {source}\n  To: {target}")
                 results['successful'] += 1
-                
-        except Exception as e:
-            error_msg = f"Error moving {source}: {str(e)}"
-            results['errors'].append(error_msg)
-            results['failed'] += 1
-            print(error_msg)
+            except Exception as e:
+                error_msg = f"Error moving {source}: {str(e)}"
+                results['errors'].append(error_msg)
+                results['failed'] += 1
+                print(error_msg)
     
+    results['moves_df'] = pd.DataFrame(planned, columns=['Source', 'Destination', 'Status'])
     return results
 
 def save_moves_to_excel(moves_df, output_path="planned_moves.xlsx"):
@@ -171,6 +240,15 @@ def save_moves_to_excel(moves_df, output_path="planned_moves.xlsx"):
     except Exception as e:
         print(f"Error saving moves to Excel: {e}")
 
+def save_moves_to_parquet(moves_df, output_path="planned_moves.parquet"):
+    """Save the planned moves to a Parquet file (needs pyarrow)."""
+    try:
+        moves_df.to_parquet(output_path, index=False)
+        print(f"\nPlanned moves saved to: {output_path}")
+    except Exception as e:
+        print(f"Error saving moves to Parquet: {e}")
+        save_moves_to_excel(moves_df)
+
 def main():
     parser = setup_parser()
     args = parser.parse_args()
@@ -188,22 +266,25 @@ def main():
     if df is None:
         return
     
-    # Plan moves with normalized path
-    print("\nPlanning file organization...")
-    moves, errors, status_counts = plan_file_moves(df, root_dir)
+    # Plan moves with normalized path; each move is executed or simulated as soon as it is planned
+    print(f"\nPlanning and {'executing' if args.prod else 'simulating'} file moves "
+          "(planning errors are listed at the end)...")
+    errors = []
+    status_counts = new_status_counts()
+    moves = iter_file_moves(df, root_dir, errors, status_counts)
+    results = execute_moves(moves, dry_run=not args.prod, max_workers=args.workers)
     
     if errors:
         print("\nErrors during planning:")
         for error in errors:
             print(f"  - {error}")
     
-    # Execute or simulate moves
-    print(f"\n{'Executing' if args.prod else 'Simulating'} file moves...")
-    results = execute_moves(moves, dry_run=not args.prod)
-    
-    # Save dry run results to Excel
+    # Save dry run results
     if not args.prod:
-        save_moves_to_excel(results['moves_df'])
+        if args.moves_format == 'parquet':
+            save_moves_to_parquet(results['moves_df'])
+        else:
+            save_moves_to_excel(results['moves_df'])
     
     # Print summary
     print("\nSummary:")
@@ -213,7 +294,7 @@ def main():
     print(f"  Files marked as OK: {status_counts.get('ok', 0)}")
     print(f"  Files marked as duplicate (skipped): {status_counts.get('duplicate', 0)}")
     print(f"  Files marked for rename: {status_counts.get('error', 0)}")
-    print(f"  Total files to move: {len(moves)}")
+    print(f"  Total files to move: {len(results['moves_df'])}")
     if args.prod:
         print(f"  Successfully moved: {results['successful']}")
         print(f"  Failed moves: {results['failed']}")
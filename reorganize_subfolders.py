@@ -1,10 +1,30 @@
 import os
+import errno
+import sys
+import re
+import csv
 import argparse
-import pandas as pd
 from pathlib import Path
 from datetime import datetime, timedelta
 import shutil
-from collections import defaultdict
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from tqdm import tqdm
+    TQDM_AVAILABLE = True
+except ImportError:
+    TQDM_AVAILABLE = False
+
+try:
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+
+MOVE_COLUMNS = ['Source', 'Destination', 'Target Folder']
 
 def setup_parser():
     """Configure command line arguments."""
@@ -13,115 +33,234 @@ def setup_parser():
                        help='Source directory containing media files')
     parser.add_argument('--prod', action='store_true',
                        help='Execute the actual file moves and directory deletions. Without this, only shows planned moves')
-    parser.add_argument('--output', type=str, default='planned_moves.xlsx',
-                       help='Output Excel file for planned moves (default: planned_moves.xlsx)')
+    parser.add_argument('--output', type=str, default='planned_moves.csv',
+                       help='Output file for planned moves, .csv or .xlsx (default: planned_moves.csv)')
+    parser.add_argument('--verbose', action='store_true',
+                       help='Print debugging information and every planned move')
     return parser
 
+# YYYY-MM-DD, optionally followed by _location (strptime also accepted unpadded months and days)
+DIRECTORY_NAME_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})(?:_(.*))?', re.DOTALL)
+
+@lru_cache(maxsize=None)
 def parse_directory_name(directory_name):
     """Parse directory name to extract date and location."""
-    parts = directory_name.split('_', 1)
-    if len(parts) == 2:
-        try:
-            date = datetime.strptime(parts[0], '%Y-%m-%d')
-            location = parts[1]
-            return date, location
-        except ValueError:
-            return None, None
-    else:
-        try:
-            date = datetime.strptime(parts[0], '%Y-%m-%d')
-            print(f"Found date: {date}")  # Debugging information
-            return date, None
-        except ValueError:
-            return None, None
-
-def find_subfolders_to_merge(source_dir):
-    """Find subfolders to merge based on date and location."""
+    match = DIRECTORY_NAME_RE.fullmatch(directory_name)
+    if not match:
+        return None, None
+    year, month, day, location = match.groups()
+    try:
+        date = datetime(int(year), int(month), int(day))
+    except ValueError:
+        return None, None
+    return date, location
+
+def _list_dir(path):
+    """Return (subdirectory DirEntries, file names) directly inside path, empty if unreadable."""
+    subdirs = []
+    files = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                # is_dir() uses the type from the listing, no stat per entry
+                if entry.is_dir():
+                    subdirs.append(entry)
+                else:
+                    files.append(entry.name)
+    except OSError:
+        pass
+    return subdirs, files
+
+def scan_tree(root):
+    """List every directory under root once, as {path: (subdirectory DirEntries, file names)}."""
+    # List one tree level at a time on a thread pool, since each listing is
+    # independent I/O; like os.walk, directory symlinks are listed but not entered
+    tree = {}
+    level = [root]
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        while level:
+            next_level = []
+            for path, listing in zip(level, executor.map(_list_dir, level)):
+                tree[path] = listing
+                next_level.extend(entry.path for entry in listing[0] if not entry.is_symlink())
+            level = next_level
+    return tree
+
+def _iter_dirs(root, tree, verbose=False):
+    """Yield the DirEntry of every directory under root, in os.walk top-down order."""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        if verbose:
+            print(f"Processing directory: {current}")  # Debugging information
+        subdirs = tree[current][0]
+        yield from subdirs
+        stack.extend(entry.path for entry in reversed(subdirs) if not entry.is_symlink())
+
+def _walk_files(folder, tree):
+    """Yield the path of every file under folder, in os.walk order, from the scanned tree."""
+    if folder not in tree:
+        # Not scanned (e.g. reached through a symlink): walk it now
+        for root, _, files in os.walk(folder):
+            for file in files:
+                yield os.path.join(root, file)
+        return
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        subdirs, files = tree[current]
+        for file in files:
+            yield os.path.join(current, file)
+        stack.extend(entry.path for entry in reversed(subdirs) if not entry.is_symlink())
+
+def find_subfolders_to_merge(source_dir, verbose=False):
+    """Find subfolders to merge based on date and location; also return the scanned tree."""
+    tree = scan_tree(source_dir)
     subfolders = {}
-    for root, dirs, files in os.walk(source_dir):
-        print(f"Processing directory: {root}")  # Debugging information
-        for dir_name in dirs:
-            date, location = parse_directory_name(dir_name)
-            if date:
-                key = date
-                subfolders.setdefault(key, []).append(os.path.join(root, dir_name))
-                print(f"Found subfolder: {os.path.join(root, dir_name)} with key: {key}")  # Debugging information
-    return subfolders
-
-def plan_moves(subfolders):
-    """Plan moves to merge subfolders."""
-    preferred_locations = ["Royan", "Niort", "Le Mont-Saint-Michel", "Tinténiac", "Saint-Malo", "Brest", "Barbatre", "Champagnole", "Geneve", "Jullouville", "Betton"]
+    for entry in _iter_dirs(source_dir, tree, verbose):
+        date, location = parse_directory_name(entry.name)
+        if date:
+            key = date
+            subfolders.setdefault(key, []).append(entry.path)
+            if verbose:
+                if location is None:
+                    print(f"Found date: {date}")  # Debugging information
+                print(f"Found subfolder: {entry.path} with key: {key}")  # Debugging information
+    return subfolders, tree
+
+# Locations to merge into first, best first
+PREFERRED_LOCATIONS = ["Royan", "Niort", "Le Mont-Saint-Michel", "Tinténiac", "Saint-Malo", "Brest", "Barbatre", "Champagnole", "Geneve", "Jullouville", "Betton"]
+LOCATION_RANK = {loc: rank for rank, loc in enumerate(PREFERRED_LOCATIONS)}
+
+@lru_cache(maxsize=None)
+def _name_rank(name):
+    """Rank of the preferred location in a folder name, len(PREFERRED_LOCATIONS) if none."""
+    rank = LOCATION_RANK.get(name.split('_', 1)[-1])
+    if rank is not None:
+        return rank
+    # Names like 2023-05-01_Brest-plage still match their location
+    return next((rank for rank, loc in enumerate(PREFERRED_LOCATIONS) if loc in name), len(PREFERRED_LOCATIONS))
+
+def _location_rank(folder):
+    """Rank of the preferred location in a folder path's last component."""
+    return _name_rank(os.path.basename(folder))
+
+def plan_moves(subfolders, tree, verbose=False):
+    """Plan moves to merge subfolders, listing their files from the scanned tree."""
     moves = []
     empty_dirs = set()  # Use a set to ensure uniqueness
     for date, folders in subfolders.items():
-        print (f'{date} {folders}')  # Debugging information
+        if verbose:
+            print(f'{date} {folders}')  # Debugging information
         if len(folders) > 1:
-            # Select the target folder with a preferred location in order
-            target_folder = None
-            for loc in preferred_locations:
-                target_folder = next((folder for folder in folders if loc in os.path.basename(folder)), None)
-                if target_folder:
-                    break
-            if not target_folder:
+            # Select the target folder with the best ranked preferred location,
+            # the first such folder on ties
+            target_folder = min(folders, key=_location_rank)
+            if _location_rank(target_folder) == len(PREFERRED_LOCATIONS):
                 # If no preferred location, select any folder with a location
                 target_folder = next((folder for folder in folders if '_' in os.path.basename(folder)), folders[0])
             for folder in folders:
                 if folder != target_folder:
-                    for root, _, files in os.walk(folder):
-                        for file in files:
-                            source_path = os.path.join(root, file)
-                            target_path = os.path.join(target_folder, file)
-                            moves.append((source_path, target_path, target_folder))
+                    for source_path in _walk_files(folder, tree):
+                        target_path = os.path.join(target_folder, os.path.basename(source_path))
+                        moves.append((source_path, target_path, target_folder))
+                        if verbose:
                             print(f"Planned move: {source_path} -> {target_path}")  # Debugging information
                     empty_dirs.add(folder)
-        else:
+        elif verbose:
             print(f"Skipping date {date} with only one folder")  # Debugging information
     return moves, empty_dirs
 
-def reorganize_by_location(moves, empty_dirs):
-    """Reorganize directories by merging those with the same location."""
-    location_groups = defaultdict(list)
-    for _, target_path, _ in moves:
-        target_dir = os.path.dirname(target_path)
+def reorganize_by_location(moves, empty_dirs, tree, verbose=False):
+    """Reorganize directories by merging those with the same location, listing files from the scanned tree."""
+    # Many moves share a target folder, parse each folder once, in order of first appearance
+    target_dirs = dict.fromkeys(os.path.dirname(target_path) for _, target_path, _ in moves)
+    # One sort by (location, date), locations kept in order of first appearance
+    location_order = {}
+    entries = []
+    for target_dir in target_dirs:
         date, location = parse_directory_name(os.path.basename(target_dir))
         if location:
-            location_groups[location].append((date, target_dir))
+            entries.append((location_order.setdefault(location, len(location_order)), date, target_dir))
+    entries.sort()
     
     additional_moves = []
-    for location, dirs in location_groups.items():
-        # Sort directories by date
-        dirs.sort()
+    for _, group in groupby(entries, key=itemgetter(0)):
+        dirs = [(date, target_dir) for _, date, target_dir in group]
         target_folder = dirs[0][1]
         for i in range(1, len(dirs)):
             current_date, current_folder = dirs[i]
             previous_date, previous_folder = dirs[i - 1]
             if (current_date - previous_date).days <= 14:
-                for root, _, files in os.walk(current_folder):
-                    for file in files:
-                        source_path = os.path.join(root, file)
-                        target_path = os.path.join(target_folder, file)
-                        if os.path.normpath(source_path) != os.path.normpath(target_path):
-                            additional_moves.append((source_path, target_path, target_folder))
+                for source_path in _walk_files(current_folder, tree):
+                    target_path = os.path.join(target_folder, os.path.basename(source_path))
+                    if os.path.normpath(source_path) != os.path.normpath(target_path):
+                        additional_moves.append((source_path, target_path, target_folder))
+                        if verbose:
                             print(f"Additional planned move: {source_path} -> {target_path}")  # Debugging information
                 empty_dirs.add(current_folder)
             else:
                 target_folder = current_folder
     return additional_moves
 
-def execute_moves(moves, prod=False):
-    """Execute or simulate file moves."""
+def _device(directory, devices):
+    """Return the st_dev of a directory, stat-ing each directory only once."""
+    if directory not in devices:
+        devices[directory] = os.stat(directory).st_dev
+    return devices[directory]
+
+def _copy_move(source, target):
+    """Move a file to another filesystem; copyfile uses the OS fast copy (sendfile, fcopyfile, CopyFileEx)."""
+    shutil.copyfile(source, target)
+    shutil.copystat(source, target)
+    os.remove(source)
+
+def execute_moves(moves, prod=False, verbose=False):
+    """Execute or simulate file moves, with a tqdm bar on a terminal or progress every 1%."""
     total_moves = len(moves)
-    for idx, (source, target, target_folder) in enumerate(moves, 1):
+    progress_step = max(1, total_moves // 100)
+    # The bar would be torn by per-move lines, keep plain progress with --verbose
+    use_bar = TQDM_AVAILABLE and not verbose and sys.stderr.isatty()
+    if not prod and not verbose:
+        print(f"Would move {total_moves} file(s), use --verbose to list them")
+    created_dirs = set()
+    devices = {}
+    for idx, (source, target, target_folder) in enumerate(tqdm(moves, unit='file') if use_bar else moves, 1):
         if not prod:
-            print(f"Would move: {source} -> {target}")
+            if verbose:
+                print(f"Would move: {source} -> {target}")
         else:
-            if os.path.exists(source):
-                os.makedirs(target_folder, exist_ok=True)
-                shutil.move(source, target)
-                print(f"Moved: {source} -> {target}")
-            else:
+            # Try the move and catch a missing source, rather than a stat per file up front
+            try:
+                if target_folder not in created_dirs:
+                    os.makedirs(target_folder, exist_ok=True)
+                    created_dirs.add(target_folder)
+                if _device(os.path.dirname(source), devices) == _device(target_folder, devices):
+                    # Same filesystem: a single rename, without shutil.move's extra checks
+                    try:
+                        os.replace(source, target)
+                    except OSError as e:
+                        # Bind mounts and overlays can share st_dev and still refuse the rename
+                        if e.errno != errno.EXDEV:
+                            raise
+                        _copy_move(source, target)
+                else:
+                    _copy_move(source, target)
+            except FileNotFoundError:
                 print(f"Error: Source file not found: {source}")
-        print(f"Progress: {idx}/{total_moves} ({(idx / total_moves) * 100:.2f}%)")
+            else:
+                if verbose:
+                    print(f"Moved: {source} -> {target}")
+        if not use_bar and (idx % progress_step == 0 or idx == total_moves):
+            print(f"Progress: {idx}/{total_moves} ({(idx / total_moves) * 100:.2f}%)")
+
+def _remove_dir(dir_path):
+    """Remove a directory tree, returning the OSError instead of raising it."""
+    try:
+        shutil.rmtree(dir_path)
+    except OSError as e:
+        return e
+    return None
 
 #
 def remove_empty_dirs(source_dir, prod=False):
@@ -134,21 +273,41 @@ def remove_empty_dirs(source_dir, prod=False):
                 empty_dirs.add(dir_path)
     
     if prod:
-        for dir_path in empty_dirs:
-            try:
-                shutil.rmtree(dir_path)
-                print(f"Removed empty directory: {dir_path}")
-            except OSError as e:
-                print(f"Error removing directory {dir_path}: {e}")
+        # Removals are independent, run them on a pool and report from here
+        with ThreadPoolExecutor(max_workers=min(16, len(empty_dirs) or 1)) as executor:
+            for dir_path, error in zip(empty_dirs, executor.map(_remove_dir, empty_dirs)):
+                if error is None:
+                    print(f"Removed empty directory: {dir_path}")
+                else:
+                    print(f"Error removing directory {dir_path}: {error}")
     else:
         print("\nEmpty directories that would be removed:")
         for dir_path in empty_dirs:
             print(f"- {dir_path}")
 
-def save_moves_to_excel(moves, output_path):
-    """Save the planned moves to an Excel file."""
-    df = pd.DataFrame(moves, columns=['Source', 'Destination', 'Target Folder'])
-    df.to_excel(output_path, index=False)
+def save_moves(moves, output_path):
+    """Save the planned moves to a CSV file, or to Excel for a .xlsx path."""
+    if not output_path.lower().endswith('.xlsx'):
+        with open(output_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(MOVE_COLUMNS)
+            writer.writerows(moves)
+    elif XLSXWRITER_AVAILABLE:
+        wb = xlsxwriter.Workbook(output_path, {'constant_memory': True, 'strings_to_urls': False})
+        ws = wb.add_worksheet()
+        ws.write_row(0, 0, MOVE_COLUMNS)
+        for row, move in enumerate(moves, 1):
+            ws.write_row(row, 0, move)
+        wb.close()
+    else:
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('Sheet1')
+        ws.append(MOVE_COLUMNS)
+        for move in moves:
+            ws.append(move)
+        wb.save(output_path)
     print(f"\nPlanned moves saved to: {output_path}")
 
 def main():
@@ -165,12 +324,12 @@ def main():
     print(f"Source directory: {source_dir}")
     print(f"Dry run mode: {'disabled' if args.prod else 'enabled'}")
     
-    subfolders = find_subfolders_to_merge(source_dir)
-    moves, empty_dirs = plan_moves(subfolders)
+    subfolders, tree = find_subfolders_to_merge(source_dir, verbose=args.verbose)
+    moves, empty_dirs = plan_moves(subfolders, tree, verbose=args.verbose)
     
     
     # Plan additional moves based on location
-    additional_moves = reorganize_by_location(moves, empty_dirs)
+    additional_moves = reorganize_by_location(moves, empty_dirs, tree, verbose=args.verbose)
     moves.extend(additional_moves)
 
     if not moves:
@@ -178,13 +337,13 @@ def main():
         #return
     
     # Execute all moves
-    execute_moves(moves, prod=args.prod)
+    execute_moves(moves, prod=args.prod, verbose=args.verbose)
     
     # Remove empty directories
     remove_empty_dirs(source_dir, prod=args.prod)
     
-    # Save moves to Excel
-    save_moves_to_excel(moves, args.output)
+    # Save moves to CSV or Excel
+    save_moves(moves, args.output)
     
     print("\nReorganization completed!")
 
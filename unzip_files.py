@@ -4,6 +4,7 @@ import argparse
 from pathlib import Path
 import shutil
 import getpass
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 def setup_parser():
     """Configure command line arguments."""
@@ -14,29 +15,59 @@ def setup_parser():
                        help='Destination directory for unzipped files')
     parser.add_argument('--clean', action='store_true',
                        help='Remove zip files after successful extraction')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                       help='Number of archives extracted concurrently (default: CPU count)')
     return parser
 
+# 1 MiB copy buffer, far fewer read/write calls than the default for large media files
+COPY_BUFFER_SIZE = 1024 * 1024
+
+def _member_target(info, extract_path):
+    """Target path of an archive member on POSIX, cleaned up the way ZipFile.extract does it."""
+    # Mirrors the POSIX branch of CPython's ZipFile._extract_member (3.8 to 3.13):
+    # drop leading separators and ''/'.'/'..' parts so members stay inside extract_path
+    arcname = os.path.sep.join(part for part in info.filename.split('/')
+                               if part not in ('', os.path.curdir, os.path.pardir))
+    if not arcname and not info.is_dir():
+        raise ValueError("Empty filename.")
+    return os.path.normpath(os.path.join(extract_path, arcname))
+
+def _extract_members(zip_ref, extract_path, pwd=None):
+    """Extract every member of an open archive, streaming each file with a large buffer."""
+    for info in zip_ref.infolist():
+        if os.name == 'nt':
+            # Windows needs drive and reserved character handling, and shutil already
+            # copies with a 1 MiB buffer there, so let zipfile do the whole job
+            zip_ref.extract(info, extract_path, pwd=pwd)
+            continue
+        target = _member_target(info, extract_path)
+        if info.is_dir():
+            os.makedirs(target, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with zip_ref.open(info, pwd=pwd) as src, open(target, 'wb') as dst:
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
 def unzip_file(zip_path, extract_path, remove_after=False, max_password_attempts=3):
-    """Extract a single zip file."""
+    """Extract a single zip file, returning 'processed', 'failed' or 'skipped'."""
     try:
         print(f"Extracting: {zip_path}")  # Restore progress display
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
             # Check if any file in the archive is encrypted
-            encrypted_files = [f.filename for f in zip_ref.filelist if f.flag_bits & 0x1]
-            if encrypted_files:
+            first_encrypted = next((f.filename for f in zip_ref.filelist if f.flag_bits & 0x1), None)
+            if first_encrypted is not None:
                 print(f"\nPassword protected files found in: {zip_path}")
-                print(f"First encrypted file: {encrypted_files[0]}")
+                print(f"First encrypted file: {first_encrypted}")
                 
                 for attempt in range(max_password_attempts):
                     try:
                         password = getpass.getpass(f"Enter password (attempt {attempt + 1}/{max_password_attempts}, or Enter to skip): ")
                         if not password:
                             print("Skipping password-protected file")
-                            stats['skipped'] += 1
-                            return False
+                            return 'skipped'
                         
                         print(f"Extracting with password...")  # Add extraction status
-                        zip_ref.extractall(extract_path, pwd=password.encode())
+                        _extract_members(zip_ref, extract_path, pwd=password.encode())
                         print("Successfully extracted with password")
                         break
                     except RuntimeError as e:
@@ -44,33 +75,44 @@ def unzip_file(zip_path, extract_path, remove_after=False, max_password_attempts
                             print("Incorrect password")
                             if attempt == max_password_attempts - 1:
                                 print(f"Maximum attempts ({max_password_attempts}) reached. Skipping file.")
-                                stats['skipped'] += 1
-                                return False
+                                return 'skipped'
                         else:
                             print(f"Error: {str(e)}")
-                            return False
+                            return 'failed'
             else:
                 # No encryption, extract normally
-                zip_ref.extractall(extract_path)
+                _extract_members(zip_ref, extract_path)
             
             if remove_after:
                 print(f"Removing: {zip_path}")
                 os.remove(zip_path)
-            return True
+            return 'processed'
             
     except zipfile.BadZipFile:
         print(f"Error: {zip_path} is not a valid zip file")
-        return False
+        return 'failed'
     except Exception as e:
         print(f"Error extracting {zip_path}: {str(e)}")
+        return 'failed'
+
+def _is_encrypted(zip_path):
+    """Check whether an archive has password protected entries (those need interactive prompts)."""
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            return any(f.flag_bits & 0x1 for f in zip_ref.filelist)
+    except (zipfile.BadZipFile, OSError):
+        # Let unzip_file report the error
         return False
 
-def process_directory(source_dir, dest_dir, clean=False):
+def _unzip_group(zip_paths, extract_path, remove_after=False):
+    """Extract archives sharing a destination one at a time, returning their results in order."""
+    return [unzip_file(zip_path, extract_path, remove_after) for zip_path in zip_paths]
+
+def process_directory(source_dir, dest_dir, clean=False, max_workers=None):
     """Process all zip files in source directory and its subdirectories."""
     if not os.path.exists(dest_dir):
         os.makedirs(dest_dir)
 
-    global stats  # Make stats global so unzip_file can update it
     stats = {
         'processed': 0,
         'failed': 0,
@@ -78,6 +120,7 @@ def process_directory(source_dir, dest_dir, clean=False):
     }
 
     # Walk through directory tree
+    tasks = []
     for root, _, files in os.walk(source_dir):
         for file in files:
             if file.lower().endswith('.zip'):
@@ -90,11 +133,34 @@ def process_directory(source_dir, dest_dir, clean=False):
                 if not os.path.exists(extract_path):
                     os.makedirs(extract_path)
                 
-                # Extract the zip file
-                if unzip_file(zip_path, extract_path, clean):
-                    stats['processed'] += 1
-                else:
-                    stats['failed'] += 1
+                tasks.append((zip_path, extract_path))
+
+    def count(result):
+        stats[result] += 1
+        if result == 'skipped':
+            stats['failed'] += 1  # Skipped archives are also counted as failed
+
+    # Decompression releases the GIL, so threads extract archives in parallel.
+    # The encryption checks (one central directory read each) run on the pool as well,
+    # password protected archives prompt for input and are extracted one at a time afterwards
+    encrypted, groups = [], {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        checks = executor.map(_is_encrypted, [zip_path for zip_path, _ in tasks])
+        for (zip_path, extract_path), is_encrypted in zip(tasks, checks):
+            if is_encrypted:
+                encrypted.append((zip_path, extract_path))
+            else:
+                groups.setdefault(extract_path, []).append(zip_path)
+        # Archives of one folder share a destination and often member names (e.g. Takeout parts),
+        # extract them one after another so the last one wins as a whole file
+        futures = [executor.submit(_unzip_group, zip_paths, extract_path, clean)
+                   for extract_path, zip_paths in groups.items()]
+        for future in as_completed(futures):
+            for result in future.result():
+                count(result)
+
+    for zip_path, extract_path in encrypted:
+        count(unzip_file(zip_path, extract_path, clean))
 
     return stats
 
@@ -116,9 +182,10 @@ def main():
     print(f"Source directory: {source_dir}")
     print(f"Destination directory: {dest_dir}")
     print(f"Clean mode: {'enabled' if args.clean else 'disabled'}")
+    print(f"Workers: {args.workers}")
     print("\nStarting extraction...")
     
-    stats = process_directory(source_dir, dest_dir, args.clean)
+    stats = process_directory(source_dir, dest_dir, args.clean, args.workers)
     
     print("\nExtraction completed!")
     print(f"Files processed successfully: {stats['processed']}")